@@ -3,8 +3,19 @@
 
 import json
 import logging
-import re
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from copy import deepcopy
+from urllib.parse import quote_plus
+
+try:
+    # Use the C-accelerated parser when available, it decodes the raw
+    # response bytes directly
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from pyaoscx.exceptions.bulk_operation_error import BulkOperationError
 from pyaoscx.exceptions.generic_op_error import GenericOperationError
 from pyaoscx.exceptions.response_error import ResponseError
 from pyaoscx.exceptions.verification_error import VerificationError
@@ -13,6 +24,11 @@ from pyaoscx.utils import util as utils
 
 from pyaoscx.pyaoscx_module import PyaoscxModule
 
+# HTTP status code returned to a conditional GET when data did not change
+NOT_MODIFIED = 304
+# Maximum number of concurrent requests issued by get_all and bulk_apply
+MAX_WORKERS = 16
+
 
 class BgpNeighbor(PyaoscxModule):
     """
@@ -22,6 +38,24 @@ class BgpNeighbor(PyaoscxModule):
     indices = ["ip_or_ifname_or_group_name"]
     resource_uri_name = "bgp_neighbors"
 
+    # Fixed attributes, the ones coming from the switch are still stored in
+    # the instance dictionary (see utils.create_attrs)
+    __slots__ = (
+        "session",
+        "ip_or_ifname_or_group_name",
+        "__parent_bgp_router",
+        "base_uri",
+        "path",
+        "_uri",
+        "_info_format",
+        "config_attrs",
+        "materialized",
+        "__original_attributes",
+        "__cached_get",
+        "__modified",
+        "__snapshot",
+    )
+
     def __init__(
         self,
         session,
@@ -31,18 +65,26 @@ class BgpNeighbor(PyaoscxModule):
         **kwargs
     ):
 
+        # Configuration attribute names and values of the last apply, see
+        # _snapshot()
+        self.__snapshot = None
         self.session = session
         # Assign ID
         self.ip_or_ifname_or_group_name = ip_or_ifname_or_group_name
         # Assign parent BGP Router
         self.__set_bgp_router(parent_bgp_router)
         self._uri = uri
+        # Cached object format used for referencing inside other objects
+        self._info_format = None
         # List used to determine attributes related to the BGP configuration
         self.config_attrs = []
         self.materialized = False
         # Attribute dictionary used to manage the original data
         # obtained from the GET
         self.__original_attributes = {}
+        # ETag, query parameters and data of the last GET, used to skip
+        # downloading the data again if it did not change in the switch
+        self.__cached_get = None
         # Set arguments needed for correct creation
         utils.set_creation_attrs(self, **kwargs)
         # Attribute used to know if object was changed recently
@@ -62,20 +104,62 @@ class BgpNeighbor(PyaoscxModule):
         self.base_uri = "{0}/{1}/bgp_neighbors".format(
             self.__parent_bgp_router.base_uri, self.__parent_bgp_router.asn
         )
+        self.path = "{0}/{1}".format(
+            self.base_uri, self.ip_or_ifname_or_group_name
+        )
 
-        for bgp_ngh in self.__parent_bgp_router.bgp_neighbors:
+        bgp_neighbors = self.__parent_bgp_router.bgp_neighbors
+        for i, bgp_ngh in enumerate(bgp_neighbors):
             if (
                 bgp_ngh.ip_or_ifname_or_group_name
                 == self.ip_or_ifname_or_group_name
             ):
                 # Make list element point to current object
-                bgp_ngh = self
-            else:
-                # Add self to BGP Neighbors list in parent BGP Router
-                self.__parent_bgp_router.bgp_neighbors.append(self)
+                bgp_neighbors[i] = self
+                break
+        else:
+            # Add self to BGP Neighbors list in parent BGP Router
+            bgp_neighbors.append(self)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        self.__invalidate_snapshot(name)
+
+    def __delattr__(self, name):
+        super().__delattr__(name)
+        self.__invalidate_snapshot(name)
+
+    def __invalidate_snapshot(self, name):
+        """
+        Discard the configuration snapshot if the given attribute is part of
+            the configuration
+
+        :param name: Name of the attribute that changed
+        """
+        if name == "config_attrs" or name in getattr(self, "config_attrs", ()):
+            object.__setattr__(self, "_BgpNeighbor__snapshot", None)
+
+    def _snapshot(self):
+        """
+        Obtain the configuration attributes of the object. The result is
+            reused until one of those attributes is set or deleted, the
+            config_attrs list changes (also in place), or the object data is
+            retrieved again from the switch
+
+        :return: Dictionary with the configuration attributes
+        """
+        config_attrs = tuple(self.config_attrs)
+        if self.__snapshot is None or self.__snapshot[0] != config_attrs:
+            _getattr = getattr
+            self.__snapshot = (
+                config_attrs,
+                {attr: _getattr(self, attr) for attr in config_attrs},
+            )
+        # Return a copy, callers add keys to it
+        return dict(self.__snapshot[1])
 
     @PyaoscxModule.connected
-    def get(self, depth=None, selector=None):
+    def get(self, depth=None, selector=None, expand_local_interface=False):
         """
         Perform a GET call to retrieve data for a BGP Neighbor table
         entry and fill the object with the incoming attributes
@@ -84,40 +168,76 @@ class BgpNeighbor(PyaoscxModule):
             references will be returned.
         :param selector: Alphanumeric option to select specific information to
             return.
+        :param expand_local_interface: Whether the local_interface data is
+            also retrieved from the switch. Otherwise local_interface is an
+            Interface object that is not materialized, call its get() method
+            to load its data.
         :return: Returns True if there is not an exception raised
         """
         logging.info("Retrieving %s from switch", self)
 
-        depth = depth or self.session.api.default_depth
-        selector = selector or self.session.api.default_selector
+        api = self.session.api
+        depth = depth or api.default_depth
+        selector = selector or api.default_selector
 
-        if not self.session.api.valid_depth(depth):
-            depths = self.session.api.valid_depths
+        if not api.valid_depth(depth):
+            depths = api.valid_depths
             raise Exception("ERROR: Depth should be {0}".format(depths))
 
-        if selector not in self.session.api.valid_selectors:
-            selectors = " ".join(self.session.api.valid_selectors)
+        if selector not in api.valid_selectors:
+            selectors = " ".join(api.valid_selectors)
             raise Exception(
                 "ERROR: Selector should be one of {0}".format(selectors)
             )
 
         payload = {"depth": depth, "selector": selector}
 
-        uri = "{0}/{1}".format(self.base_uri, self.ip_or_ifname_or_group_name)
+        # Ask the switch to answer 304 if the data is the same it sent
+        # the last time for this query
+        headers = None
+        cached = self.__cached_get
+        if cached is not None and cached[1] == payload:
+            headers = {"If-None-Match": cached[0]}
 
         try:
-            response = self.session.request("GET", uri, params=payload)
+            response = self.session.request(
+                "GET", self.path, params=payload, headers=headers
+            )
 
         except Exception as e:
             raise ResponseError("GET", e)
 
-        if not utils._response_ok(response, "GET"):
-            raise GenericOperationError(response.text, response.status_code)
+        if headers is not None and response.status_code == NOT_MODIFIED:
+            # Reload the cached data, attributes may have changed locally
+            data = cached[2]
+        else:
+            if not utils._response_ok(response, "GET"):
+                raise GenericOperationError(
+                    response.text, response.status_code
+                )
+
+            data = json_loads(response.content)
 
-        data = json.loads(response.text)
+            etag = response.headers.get("ETag")
+            self.__cached_get = (etag, payload, data) if etag else None
 
-        # Add dictionary as attributes for the object
+        self.__load_data(data, selector, expand_local_interface)
+        return True
+
+    def __load_data(self, data, selector, expand_local_interface=False):
+        """
+        Fill the object with the attributes retrieved from the switch and
+            mark it as materialized
+
+        :param data: Dictionary with the BGP Neighbor attributes
+        :param selector: Selector used to retrieve the data
+        :param expand_local_interface: Whether the local_interface data is
+            also retrieved from the switch
+        """
+        # Add dictionary as attributes for the object, create_attrs writes
+        # the instance dictionary directly so the snapshot is discarded here
         utils.create_attrs(self, data)
+        self.__snapshot = None
 
         # Determines if the BGP Neighbor is configurable
         if selector in self.session.api.configurable_selectors:
@@ -126,8 +246,9 @@ class BgpNeighbor(PyaoscxModule):
                 self, data, "config_attrs", ["ip_or_ifname_or_group_name"]
             )
 
-        # Set original attributes
-        self.__original_attributes = data
+        # Set original attributes, copied so they do not share structure
+        # with the data used elsewhere
+        self.__original_attributes = deepcopy(data)
         # Remove ID
         if "ip_or_ifname_or_group_name" in self.__original_attributes:
             self.__original_attributes.pop("ip_or_ifname_or_group_name")
@@ -142,12 +263,12 @@ class BgpNeighbor(PyaoscxModule):
             self.local_interface = interface_cls.from_response(
                 self.session, local_interface_response
             )
-            self.local_interface.get()
+            if expand_local_interface:
+                self.local_interface.get()
 
         # Sets object as materialized
         # Information is loaded from the Device
         self.materialized = True
-        return True
 
     @classmethod
     def get_all(cls, session, parent_bgp_router):
@@ -169,28 +290,73 @@ class BgpNeighbor(PyaoscxModule):
             parent_bgp_router.base_uri, parent_bgp_router.asn
         )
 
+        # Request the neighbors' data inline to avoid one GET per neighbor
+        api = session.api
+        selector = api.default_selector
+        payload = {"depth": api.default_facts_depth, "selector": selector}
+
         try:
-            response = session.request("GET", uri)
+            response = session.request("GET", uri, params=payload)
         except Exception as e:
             raise ResponseError("GET", e)
 
         if not utils._response_ok(response, "GET"):
             raise GenericOperationError(response.text, response.status_code)
 
-        data = json.loads(response.text)
+        data = json_loads(response.content)
+
+        # Collections are returned as a dictionary indexed by ID, or as a
+        # list in API version 1. Items are either the BGP Neighbor data or,
+        # if it was not returned inline, its URI
+        if isinstance(data, dict):
+            items = list(data.items())
+        else:
+            items = [
+                (
+                    item.get("ip_or_ifname_or_group_name")
+                    if isinstance(item, dict)
+                    else None,
+                    item,
+                )
+                for item in data
+            ]
 
         bgp_dict = {}
-        # Get all URI elements in the form of a list
-        uri_list = session.api.get_uri_from_data(data)
+        # URIs of the BGP Neighbors whose data was not returned inline
+        uri_list = []
+        for key, neighbor_data in items:
+            if not isinstance(neighbor_data, dict):
+                uri_list.append(neighbor_data)
+                continue
+            if key is None:
+                raise VerificationError(
+                    "BGP Neighbor", "ID missing in the switch response"
+                )
+            # Use the same encoded ID form from_uri obtains, so interface
+            # names and IPv6 addresses build valid and matching paths
+            ip_or_ifname_or_group_name = cls.__encode_index(key)
+            bgp_neighbor = cls(
+                session, ip_or_ifname_or_group_name, parent_bgp_router
+            )
+            bgp_neighbor.__load_data(neighbor_data, selector)
+            bgp_dict[ip_or_ifname_or_group_name] = bgp_neighbor
 
+        pending = []
         for uri in uri_list:
             # Create a BgpNeighbor object
-            ip_or_ifname_or_group_name, bgp_neighbor = BgpNeighbor.from_uri(
+            ip_or_ifname_or_group_name, bgp_neighbor = cls.from_uri(
                 session, parent_bgp_router, uri
             )
-            # Load all BGP Neighbor data from within the Switch
-            bgp_neighbor.get()
             bgp_dict[ip_or_ifname_or_group_name] = bgp_neighbor
+            pending.append(bgp_neighbor)
+
+        # Load the remaining BGP Neighbors data from within the Switch, the
+        # requests are issued concurrently so their network latency overlaps
+        if pending:
+            workers = min(MAX_WORKERS, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Consume the results so exceptions are raised here
+                list(executor.map(lambda neighbor: neighbor.get(), pending))
 
         return bgp_dict
 
@@ -216,6 +382,72 @@ class BgpNeighbor(PyaoscxModule):
         self.__modified = modified
         return modified
 
+    @classmethod
+    def bulk_apply(cls, session, parent_bgp_router, neighbors):
+        """
+        Create or update several BGP Neighbors inside a BGP Router. The
+            requests are issued concurrently so their network latency
+            overlaps, each BGP Neighbor is applied as in apply()
+
+        :param cls: Object's class
+        :param session: pyaoscx.Session object used to represent a logical
+            connection to the device
+        :param parent_bgp_router: parent BgpRouter object where the BGP
+            Neighbors are stored
+        :param neighbors: Iterable of BgpNeighbor objects, all of them
+            stored in parent_bgp_router and with different IDs
+        :return: Dictionary containing BGP Neighbors IDs as keys and
+            whether each one was created or modified as values
+        :raises BulkOperationError: if any BGP Neighbor failed to be
+            applied, it contains the outcome of every BGP Neighbor
+        """
+        neighbors = list(neighbors)
+        indices = set()
+        for neighbor in neighbors:
+            if neighbor.__parent_bgp_router is not parent_bgp_router:
+                raise VerificationError(
+                    "BGP Neighbor",
+                    "{0} is not stored in the given BGP Router".format(
+                        neighbor
+                    ),
+                )
+            # Objects with the same ID would race on the same resource
+            if neighbor.ip_or_ifname_or_group_name in indices:
+                raise VerificationError(
+                    "BGP Neighbor", "{0} is duplicated".format(neighbor)
+                )
+            indices.add(neighbor.ip_or_ifname_or_group_name)
+
+        if not neighbors:
+            return {}
+
+        if not session.connected:
+            session.open()
+
+        # Apply the parent once, instead of racing to do it in every thread
+        if not parent_bgp_router.materialized:
+            parent_bgp_router.apply()
+
+        results = {}
+        errors = {}
+        workers = min(MAX_WORKERS, len(neighbors))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(neighbor.apply): neighbor
+                for neighbor in neighbors
+            }
+            for future in as_completed(futures):
+                index = futures[future].ip_or_ifname_or_group_name
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    errors[index] = e
+
+        if errors:
+            raise BulkOperationError(results, errors)
+
+        return results
+
     @PyaoscxModule.connected
     def update(self):
         """
@@ -227,7 +459,7 @@ class BgpNeighbor(PyaoscxModule):
         # Variable returned
         modified = False
 
-        bgp_neighbor_data = utils.get_attrs(self, self.config_attrs)
+        bgp_neighbor_data = self._snapshot()
 
         # Get ISL port uri
         if self.local_interface is not None:
@@ -235,18 +467,18 @@ class BgpNeighbor(PyaoscxModule):
                 "local_interface"
             ] = self.local_interface.get_info_format()
 
-        uri = "{0}/{1}".format(self.base_uri, self.ip_or_ifname_or_group_name)
-
         # Compare dictionaries
         if bgp_neighbor_data == self.__original_attributes:
             # Object was not modified
             modified = False
 
         else:
-            put_data = json.dumps(bgp_neighbor_data)
+            put_data = json.dumps(bgp_neighbor_data, separators=(",", ":"))
 
             try:
-                response = self.session.request("PUT", uri, data=put_data)
+                response = self.session.request(
+                    "PUT", self.path, data=put_data
+                )
 
             except Exception as e:
                 raise ResponseError("PUT", e)
@@ -257,8 +489,9 @@ class BgpNeighbor(PyaoscxModule):
                 )
 
             logging.info("SUCCESS: Updating %s", self)
-            # Set new original attributes
-            self.__original_attributes = bgp_neighbor_data
+            # Set new original attributes, copied so later in-place changes
+            # to the object's attributes are detected by the comparison
+            self.__original_attributes = deepcopy(bgp_neighbor_data)
             # Object was modified
             modified = True
         return modified
@@ -271,7 +504,7 @@ class BgpNeighbor(PyaoscxModule):
 
         :return: Boolean, True if entry was created
         """
-        bgp_neighbor_data = utils.get_attrs(self, self.config_attrs)
+        bgp_neighbor_data = self._snapshot()
         bgp_neighbor_data[
             "ip_or_ifname_or_group_name"
         ] = self.ip_or_ifname_or_group_name
@@ -290,7 +523,7 @@ class BgpNeighbor(PyaoscxModule):
                     "local_interface"
                 ] = self.local_interface.get_info_format()
 
-        post_data = json.dumps(bgp_neighbor_data)
+        post_data = json.dumps(bgp_neighbor_data, separators=(",", ":"))
 
         try:
             response = self.session.request(
@@ -305,8 +538,28 @@ class BgpNeighbor(PyaoscxModule):
 
         logging.info("SUCCESS: Adding %s", self)
 
-        # Get all object's data
-        self.get()
+        # Use the created resource if the switch returned it, otherwise
+        # get all object's data
+        data = None
+        if response.content:
+            try:
+                data = json_loads(response.content)
+            except ValueError:
+                # Body is not JSON, e.g. a plain text message
+                data = None
+
+        # The body is taken as the resource only if it contains every
+        # attribute that was sent, other JSON objects (e.g. messages) are
+        # ignored
+        bgp_neighbor_data.pop("ip_or_ifname_or_group_name")
+        if (
+            isinstance(data, dict)
+            and bgp_neighbor_data
+            and all(attr in data for attr in bgp_neighbor_data)
+        ):
+            self.__load_data(data, self.session.api.default_selector)
+        else:
+            self.get()
 
         # Object was modified, as it was created inside Device
         return True
@@ -317,10 +570,8 @@ class BgpNeighbor(PyaoscxModule):
         Perform DELETE call to delete BGP Neighbor table entry.
         """
 
-        uri = "{0}/{1}".format(self.base_uri, self.ip_or_ifname_or_group_name)
-
         try:
-            response = self.session.request("DELETE", uri)
+            response = self.session.request("DELETE", self.path)
 
         except Exception as e:
             raise ResponseError("DELETE", e)
@@ -331,15 +582,21 @@ class BgpNeighbor(PyaoscxModule):
         logging.info("SUCCESS: Deleting %s", self)
 
         # Delete back reference from BGP_Routers
-        for neighbor in self.__parent_bgp_router.bgp_neighbors:
+        bgp_neighbors = self.__parent_bgp_router.bgp_neighbors
+        for i, neighbor in enumerate(bgp_neighbors):
             if (
                 neighbor.ip_or_ifname_or_group_name
                 == self.ip_or_ifname_or_group_name
             ):
-                self.__parent_bgp_router.bgp_neighbors.remove(neighbor)
+                # Delete by index, ReferenceList.remove() would issue
+                # another DELETE request for the same entry
+                del bgp_neighbors[i]
+                break
 
         # Delete object attributes
         utils.delete_attrs(self, self.config_attrs)
+        self._info_format = None
+        self.__cached_get = None
 
     @classmethod
     def from_response(cls, session, parent_bgp_router, response_data):
@@ -368,6 +625,18 @@ class BgpNeighbor(PyaoscxModule):
         bgp_neighbor_id = bgp_arr[0]
         return BgpNeighbor(session, bgp_neighbor_id, parent_bgp_router)
 
+    @staticmethod
+    def __encode_index(index):
+        """
+        Percent-encode a BGP Neighbor ID the way the switch does in its URIs
+
+        :param index: BGP Neighbor ID, either plain or already encoded
+        :return: Encoded BGP Neighbor ID
+        """
+        if r"%2F" in index or r"%2C" in index or r"%3A" in index:
+            return index
+        return quote_plus(index)
+
     @classmethod
     def from_uri(cls, session, parent_bgp_router, uri):
         """
@@ -383,8 +652,7 @@ class BgpNeighbor(PyaoscxModule):
             BGP's ID
         """
         # Obtain ID from URI
-        index_pattern = re.compile(r"(.*)bgp_neighbors/(?P<index>.+)")
-        index = index_pattern.match(uri).group("index")
+        index = uri.rsplit("bgp_neighbors/", 1)[1]
 
         # Create BGP object
         bgp_obj = BgpNeighbor(session, index, parent_bgp_router, uri=uri)
@@ -402,10 +670,8 @@ class BgpNeighbor(PyaoscxModule):
         return: Object's URI
         """
         if self._uri is None:
-            self._uri = "{0}{1}/{2}".format(
-                self.session.resource_prefix,
-                self.base_uri,
-                self.ip_or_ifname_or_group_name,
+            self._uri = "{0}{1}".format(
+                self.session.resource_prefix, self.path
             )
 
         return self._uri
@@ -418,7 +684,10 @@ class BgpNeighbor(PyaoscxModule):
 
         :return: Object format depending on the API Version
         """
-        return self.session.api.get_index(self)
+        if self._info_format is None:
+            self._info_format = self.session.api.get_index(self)
+
+        return self._info_format
 
     @property
     def modified(self):
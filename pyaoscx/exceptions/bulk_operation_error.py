@@ -0,0 +1,27 @@
+# (C) Copyright 2019-2023 Hewlett Packard Enterprise Development LP.
+# Apache License 2.0
+
+from pyaoscx.exceptions.pyaoscx_error import PyaoscxError
+
+
+class BulkOperationError(PyaoscxError):
+    """
+    PYAOSCX Bulk Operation Error Exception. Raised when some of the objects
+        of a bulk operation failed, it keeps the outcome of every object.
+    """
+
+    base_msg = "BULK OPERATION ERROR"
+
+    def __init__(self, results, errors):
+        # Results of the objects that succeeded, indexed by object ID
+        self.results = results
+        # Exceptions raised by the objects that failed, indexed by object ID
+        self.errors = errors
+
+    def __str__(self):
+        msg_parts = [self.base_msg]
+        for index, error in self.errors.items():
+            msg_parts.append("{0} DETAIL".format(index))
+            msg_parts.append(str(error))
+        msg = ": ".join(msg_parts)
+        return repr(msg)
@@ -265,7 +265,7 @@ class PyaoscxModule(ABC):
         :display_module_name: Module to display in logs.
         :display_verb: verb to display in logs.
         """
-        send_data = json.dumps(data, sort_keys=True, indent=4)
+        send_data = json.dumps(data, separators=(",", ":"))
 
         try:
             response = self.session.request(http_verb, path, data=send_data)
@@ -8,6 +8,14 @@ import re
 
 import requests
 
+from requests.adapters import (
+    DEFAULT_POOLBLOCK,
+    DEFAULT_POOLSIZE,
+    DEFAULT_RETRIES,
+    HTTPAdapter,
+)
+from urllib3.util.retry import Retry
+
 from pyaoscx.exceptions.login_error import LoginError
 from pyaoscx.exceptions.verification_error import VerificationError
 
@@ -18,6 +26,14 @@ from pyaoscx.api import API
 # Global Variables
 ZEROIZED = 268
 UNAUTHORIZED = 401
+# Connection pool settings, the pool must be large enough to keep alive the
+# connections used by concurrent requests (see BgpNeighbor.get_all)
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+MAX_RETRIES = 2
+RETRY_BACKOFF_FACTOR = 0.1
+# HTTP operations supported by Session.request
+OPERATIONS = ("PUT", "GET", "POST", "DELETE")
 
 
 class Session:
@@ -95,7 +111,10 @@ class Session:
         if req_session.proxies != {}:
             session.proxy = req_session.proxies
 
-        # Set request.Session()
+        # Set request.Session(), with the same connection pooling used by
+        # the sessions created by login(), adapters configured by the
+        # caller are kept
+        cls.__mount_adapters(req_session, only_default=True)
         session.s = req_session
         session.connected = True
 
@@ -205,6 +224,7 @@ class Session:
         login_headers = {"Accept": "*/*", "x-use-csrf-token": "true"}
 
         s = requests.Session()
+        cls.__mount_adapters(s)
         o = requests.utils.urlparse(base_url)
 
         if use_proxy is False:
@@ -329,7 +349,15 @@ class Session:
         )
         return uri
 
-    def request(self, operation, path, params=None, data=None, verify=False):
+    def request(
+        self,
+        operation,
+        path,
+        params=None,
+        data=None,
+        verify=False,
+        headers=None,
+    ):
         """
         Perform a Request to the switch.
 
@@ -338,29 +366,67 @@ class Session:
         :param params: Extra request parameters.
         :param data: Data to send in the resquest.
         :param verify: If session should verify.
+        :param headers: Extra headers merged with the session's headers.
         :return: response object from the request.
         """
-        operations = {
-            "PUT": self.s.put,
-            "GET": self.s.get,
-            "POST": self.s.post,
-            "DELETE": self.s.delete,
-        }
-
-        if operation not in operations:
+        if operation not in OPERATIONS:
             raise VerificationError(
                 "The operation {0} is not supported."
-                " Use any of {1}".format(operation, list(operations.keys))
+                " Use any of {1}".format(operation, list(OPERATIONS))
             )
 
-        return operations[operation](
+        return self.s.request(
+            operation,
             self._build_uri(path),
             verify=verify,
             params=params,
             data=data,
+            headers=headers,
             proxies=self.proxy,
         )
 
+    @classmethod
+    def __mount_adapters(cls, session, only_default=False):
+        """
+        Mount pooled HTTP adapters in the requests' session, so connections
+            (and their TLS handshake) are reused across requests.
+
+        :param session: requests.Session object.
+        :param only_default: Whether to replace only the adapters that are
+            still the ones requests mounts by default, leaving alone the
+            adapters configured by the caller.
+        """
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=Retry(
+                total=MAX_RETRIES, backoff_factor=RETRY_BACKOFF_FACTOR
+            ),
+        )
+        for prefix in ("http://", "https://"):
+            current = session.adapters.get(prefix)
+            if only_default and not cls.__is_default_adapter(current):
+                continue
+            session.mount(prefix, adapter)
+
+    @classmethod
+    def __is_default_adapter(cls, adapter):
+        """
+        Verify if an adapter is the one requests mounts by default.
+
+        :param adapter: Adapter object, or None.
+        :return: True if the adapter is missing or has requests' defaults.
+        """
+        if adapter is None:
+            return True
+        return (
+            type(adapter) is HTTPAdapter
+            and adapter._pool_connections == DEFAULT_POOLSIZE
+            and adapter._pool_maxsize == DEFAULT_POOLSIZE
+            and adapter._pool_block == DEFAULT_POOLBLOCK
+            and adapter.max_retries.total == DEFAULT_RETRIES
+        )
+
     @classmethod
     def __assign_csrftoken(cls, response, session):
         if "X-Csrf-Token" in response.headers: